@@ -1,19 +1,58 @@
 # api.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
-from typing import Optional
-from uuid import UUID
-from decimal import Decimal
+from fastapi import APIRouter, Body, Depends, HTTPException, status, Query, Path, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+from pydantic import ValidationError
+from typing import Iterable, Optional
+from collections import OrderedDict, defaultdict
+from itertools import count, islice
+from sortedcontainers import SortedKeyList
+from uuid import UUID, uuid4
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+import asyncio
+import email.message
+import hashlib
+import json
 
 from models import (
     ProductoCreate,
     ProductoOut,
     ProductoUpdate,
     ProductosPage,
+    PRECIO_MAX,
+    _CAT_BIT,
+    _a_centavos,
+    _cat_mask,
     _strip_accents,  # función utilitaria del modelo para normalizar texto
 )
 
 router = APIRouter(prefix="/api", tags=["productos"])
 
+# Tope de productos por lote: acota cuánto tiempo se retiene el lock de escritura
+BULK_MAX = 100
+
+# Cota superior para desempatar por ID en el índice de precios
+_UUID_MAX = UUID(int=(1 << 128) - 1)
+
+
+# ---------------------- Cachés en memoria ----------------------
+class _LRU:
+    # Caché LRU mínima sobre OrderedDict, con tamaño máximo fijo
+    def __init__(self, maxsize: int):
+        self._data: OrderedDict = OrderedDict()
+        self._maxsize = maxsize
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value) -> None:
+        self._data[key] = value
+        if len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
 
 # ---------------- Repositorio en memoria (demo) ----------------
 class RepoProductos:
@@ -21,12 +60,73 @@ class RepoProductos:
         # Diccionario por ID y un índice por nombre normalizado
         self._items: dict[UUID, ProductoOut] = {}
         self._name_to_id: dict[str, UUID] = {}
+        # Nombre en minúsculas y sin acentos, precalculado para la búsqueda `q`
+        self._norm_search: dict[UUID, str] = {}
+        # Índice secundario por categoría (dict como conjunto ordenado de IDs)
+        self._by_cat: defaultdict[str, dict[UUID, None]] = defaultdict(dict)
+        # Número de alta por ID: da el orden del catálogo (el mismo que _items)
+        self._seq: dict[UUID, int] = {}
+        self._next_seq = count()
+        # Máscara de bits de categorías por ID (ver _CAT_BIT)
+        self._masks: dict[UUID, int] = {}
+        # Precio en centavos por ID: los filtros comparan int en vez de Decimal
+        self._cents: dict[UUID, int] = {}
+        # Índice ordenado por (centavos, id) para filtrar rangos con búsqueda binaria
+        self._by_price = SortedKeyList(key=lambda p: (_a_centavos(p.precio), p.id))
+        # Solo las escrituras toman el lock: obtener/listar leen los dicts sin bloquear
+        # (no hay `await` entre la lectura y el uso, así que ven un estado consistente)
+        self._write_lock = asyncio.Lock()
+        # Se incrementa en cada escritura; invalida las respuestas GET cacheadas
+        self._version: int = 0
+        # JSON ya serializado de las respuestas GET, por (versión, consulta). Vive en la
+        # instancia para que dos repositorios con la misma versión no compartan entradas.
+        self.respuestas = _LRU(1024)
+        # Prefijo por instancia: distingue ETags de otro repositorio o de antes de reiniciar
+        self._etag_prefix = uuid4().hex[:8]
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def etag(self) -> str:
+        return f'"{self._etag_prefix}-{self._version}"'
 
     @staticmethod
     def _norm_name(nombre: str) -> str:
         return nombre.lower()
 
-    async def existe_nombre(self, nombre_norm: str, *, exclude_id: Optional[UUID] = None) -> bool:
+    def _indexar_categorias(self, id_: UUID, categorias: Iterable[str]) -> None:
+        # Cada dict de categoría se mantiene en orden de catálogo (número de alta) para
+        # que listar no tenga que ordenarlo; _seq[id_] ya tiene que estar asignado.
+        seq = self._seq
+        for c in categorias:
+            ids = self._by_cat[c]
+            if id_ in ids:
+                continue
+            if ids and seq[next(reversed(ids))] > seq[id_]:
+                # Un producto existente suma la categoría en un update: reconstruimos el
+                # dict de esa categoría (una alta nueva siempre va al final y no entra acá)
+                self._by_cat[c] = dict.fromkeys(sorted([*ids, id_], key=seq.__getitem__))
+            else:
+                ids[id_] = None
+
+    def _desindexar_categorias(self, id_: UUID, categorias: Iterable[str]) -> None:
+        for c in categorias:
+            ids = self._by_cat.get(c)
+            if ids is None:
+                continue
+            ids.pop(id_, None)
+            if not ids:
+                del self._by_cat[c]
+
+    def _rango_precio(self, min_cents: Optional[int], max_cents: Optional[int]) -> tuple[int, int]:
+        # Posiciones [lo, hi) dentro de _by_price que cumplen el rango (O(log n))
+        lo = 0 if min_cents is None else self._by_price.bisect_key_left((min_cents,))
+        hi = len(self._by_price) if max_cents is None else self._by_price.bisect_key_right((max_cents, _UUID_MAX))
+        return lo, hi
+
+    def existe_nombre(self, nombre_norm: str, *, exclude_id: Optional[UUID] = None) -> bool:
         found = self._name_to_id.get(nombre_norm)
         if found is None:
             return False
@@ -35,12 +135,52 @@ class RepoProductos:
         return True
 
     async def crear(self, prod: ProductoCreate) -> ProductoOut:
-        item = ProductoOut(**prod.model_dump())
+        async with self._write_lock:
+            # Unicidad dentro del lock para que dos POST simultáneos no dupliquen el nombre
+            if self.existe_nombre(self._norm_name(prod.nombre)):
+                raise HTTPException(
+                    status_code=409,
+                    detail={"code": "DUPLICATE_NAME", "message": "Ya existe un producto con ese nombre"},
+                )
+            # `prod` ya está validado: construimos sin volver a pasar por los validadores
+            item = ProductoOut.model_construct(**prod.__dict__, id=uuid4())
+            self._registrar(item)
+            self._by_price.add(item)
+            self._version += 1
+            return item
+
+    async def crear_varios(self, prods: list[ProductoCreate]) -> list[ProductoOut]:
+        # Alta en bloque: una sola verificación de unicidad y una sola sección crítica
+        nombres = [self._norm_name(p.nombre) for p in prods]
+        if len(set(nombres)) != len(nombres):
+            raise HTTPException(
+                status_code=409,
+                detail={"code": "DUPLICATE_NAME", "message": "Hay nombres repetidos en el lote"},
+            )
+        async with self._write_lock:
+            if not self._name_to_id.keys().isdisjoint(nombres):
+                raise HTTPException(
+                    status_code=409,
+                    detail={"code": "DUPLICATE_NAME", "message": "Ya existe un producto con ese nombre"},
+                )
+            nuevos = [ProductoOut.model_construct(**p.__dict__, id=uuid4()) for p in prods]
+            for item in nuevos:
+                self._registrar(item)
+            self._by_price.update(nuevos)
+            self._version += 1
+            return nuevos
+
+    def _registrar(self, item: ProductoOut) -> None:
+        # Alta en _items y en los índices por ID (el índice de precios lo maneja quien llama)
         self._items[item.id] = item
+        self._seq[item.id] = next(self._next_seq)
         self._name_to_id[self._norm_name(item.nombre)] = item.id
-        return item
+        self._norm_search[item.id] = _strip_accents(item.nombre.lower())
+        self._indexar_categorias(item.id, item.categorias)
+        self._masks[item.id] = _cat_mask(item.categorias)
+        self._cents[item.id] = _a_centavos(item.precio)
 
-    async def obtener(self, id_: UUID) -> Optional[ProductoOut]:
+    def obtener(self, id_: UUID) -> Optional[ProductoOut]:
         return self._items.get(id_)
 
     async def listar(
@@ -52,37 +192,98 @@ class RepoProductos:
         limit: int,
         offset: int,
     ) -> tuple[list[ProductoOut], int]:
-        datos = list(self._items.values())
-
-        # Filtro por texto en nombre
-        if q:
-            qn = _strip_accents(q.strip().lower())
-            datos = [p for p in datos if qn in _strip_accents(p.nombre.lower())]
-
-        # Filtro por categoría
-        if categoria:
-            cat = _strip_accents(categoria.strip().lower())
-            datos = [p for p in datos if cat in p.categorias]
-
-        # Filtros de precio (comparación Decimal vs Decimal)
-        if min_precio is not None:
-            datos = [p for p in datos if p.precio >= min_precio]
-        if max_precio is not None:
-            datos = [p for p in datos if p.precio <= max_precio]
-
-        total = len(datos)
-        # Paginación
-        datos = datos[offset: offset + limit]
-        return datos, total
+        # Normalizamos los criterios una sola vez por consulta
+        qn = _strip_accents(q.strip().lower()) if q else None
+        cat_n = _strip_accents(categoria.strip().lower()) if categoria else None
+        has_q = qn is not None
+        # Ningún producto supera PRECIO_MAX: un mínimo mayor no da resultados y un
+        # máximo mayor equivale a no tener cota (así tampoco convertimos valores enormes)
+        if min_precio is not None and min_precio > PRECIO_MAX:
+            return [], 0
+        if max_precio is not None and max_precio > PRECIO_MAX:
+            max_precio = None
+        has_min = min_precio is not None
+        has_max = max_precio is not None
+        has_precio = has_min or has_max
+        # Cotas en centavos: precio >= min  <=>  centavos >= ceil(min*100) (y al revés para max)
+        min_c = _a_centavos(min_precio, ROUND_CEILING) if has_min else None
+        max_c = _a_centavos(max_precio, ROUND_FLOOR) if has_max else None
+
+        # Índices en variables locales: evitan resolver `self.` por cada producto
+        items = self._items
+        norm_search = self._norm_search
+        masks = self._masks
+        cents = self._cents
+        seq = self._seq
+        by_price = self._by_price
+
+        if has_precio:
+            lo, hi = self._rango_precio(min_c, max_c)
+            # Una cota ausente queda abierta: todo precio está en [0, PRECIO_MAX]
+            if not has_min:
+                min_c = 0
+            if not has_max:
+                max_c = _a_centavos(PRECIO_MAX)
+        if cat_n is not None:
+            cat_ids = self._by_cat.get(cat_n, {})
+
+        # El resultado sale siempre en el orden del catálogo (número de alta, igual que sin
+        # filtros) para que paginar con distintos filtros sea consistente. El índice de
+        # precios sale ordenado por precio y hay que reordenarlo, así que solo conviene si
+        # el rango es menos de 1/8 de lo que habría que recorrer; con rangos más anchos
+        # (p. ej. 50k productos y min_precio=1) es más rápido recorrer en orden de catálogo.
+        if has_precio and hi - lo < (len(items) if cat_n is None else len(cat_ids)) // 8:
+            rango = by_price.islice(lo, hi)
+            if cat_n is not None:
+                bit = _CAT_BIT.get(cat_n, 0)
+                rango = [p for p in rango if masks[p.id] & bit]
+            candidatos = sorted(rango, key=lambda p: seq[p.id])
+        elif cat_n is not None:
+            # Los IDs de la categoría ya están en orden de catálogo (ver _indexar_categorias)
+            if has_precio and len(cat_ids) < len(items) // 8:
+                # Comparación de enteros (centavos) sobre el conjunto (chico) de la categoría
+                candidatos = [p for p in map(items.__getitem__, cat_ids) if min_c <= cents[p.id] <= max_c]
+            elif has_precio:
+                # Categoría grande: buscar cada ID cuesta más que recorrer todo el catálogo
+                # con _masks y _cents en paralelo (ver abajo)
+                bit = _CAT_BIT.get(cat_n, 0)
+                candidatos = [
+                    p for p, m, c in zip(items.values(), masks.values(), cents.values())
+                    if m & bit and min_c <= c <= max_c
+                ]
+            else:
+                candidatos = map(items.__getitem__, cat_ids)
+                total = len(cat_ids)
+        elif has_precio:
+            # _cents y _masks se dan de alta y de baja junto con _items: mismas claves en
+            # el mismo orden, así que se recorren en paralelo sin buscar cada ID
+            candidatos = [p for p, c in zip(items.values(), cents.values()) if min_c <= c <= max_c]
+        else:
+            candidatos, total = items.values(), len(items)
+
+        # Filtro por texto sobre los candidatos ya acotados por los índices
+        if has_q:
+            candidatos = [p for p in candidatos if qn in norm_search[p.id]]
+
+        # Los caminos que filtran arman una lista: su largo ya es el total
+        if isinstance(candidatos, list):
+            return candidatos[offset: offset + limit], len(candidatos)
+        # Paginación sin materializar el resto de candidatos
+        return list(islice(candidatos, offset, offset + limit)), total
 
     async def actualizar_full(self, id_: UUID, prod: ProductoCreate) -> ProductoOut:
-        actual = await self.obtener(id_)
+        async with self._write_lock:
+            return await self._reemplazar(id_, prod)
+
+    async def _reemplazar(self, id_: UUID, prod: ProductoCreate) -> ProductoOut:
+        # Reemplazo total; quien llama debe tener tomado self._write_lock
+        actual = self.obtener(id_)
         if not actual:
             raise HTTPException(status_code=404, detail="Producto no encontrado")
 
         # Unicidad de nombre (excluyendo este ID)
         nombre_norm = self._norm_name(prod.nombre)
-        if await self.existe_nombre(nombre_norm, exclude_id=id_):
+        if self.existe_nombre(nombre_norm, exclude_id=id_):
             raise HTTPException(
                 status_code=409,
                 detail={"code": "DUPLICATE_NAME", "message": "Ya existe un producto con ese nombre"},
@@ -93,46 +294,75 @@ class RepoProductos:
         if viejo_norm in self._name_to_id:
             del self._name_to_id[viejo_norm]
 
-        nuevo = ProductoOut(id=id_, **prod.model_dump())
+        nuevo = ProductoOut.model_construct(
+            id=id_, nombre=prod.nombre, precio=prod.precio, categorias=prod.categorias
+        )
         self._items[id_] = nuevo
         self._name_to_id[nombre_norm] = id_
+        self._norm_search[id_] = _strip_accents(nuevo.nombre.lower())
+        self._desindexar_categorias(id_, set(actual.categorias) - set(nuevo.categorias))
+        self._indexar_categorias(id_, nuevo.categorias)
+        self._masks[id_] = _cat_mask(nuevo.categorias)
+        self._cents[id_] = _a_centavos(nuevo.precio)
+        self._by_price.remove(actual)
+        self._by_price.add(nuevo)
+        self._version += 1
         return nuevo
 
-    async def actualizar_partial(self, id_: UUID, cambios: ProductoUpdate) -> ProductoOut:
-        actual = await self.obtener(id_)
-        if not actual:
-            raise HTTPException(status_code=404, detail="Producto no encontrado")
-
-        # Mezclamos actual + cambios (y validamos con ProductoCreate para reutilizar reglas)
-        base = {
-            "nombre": actual.nombre,
-            "precio": actual.precio,
-            "categorias": actual.categorias,
-        }
-        patch = cambios.model_dump(exclude_unset=True)
-        base.update(patch)
-
-        candidato = ProductoCreate(**base)
-
-        # Checar unicidad si cambió el nombre
-        if candidato.nombre.lower() != actual.nombre.lower():
-            if await self.existe_nombre(self._norm_name(candidato.nombre)):
-                raise HTTPException(
-                    status_code=409,
-                    detail={"code": "DUPLICATE_NAME", "message": "Ya existe un producto con ese nombre"},
-                )
-
-        # Reutilizamos la lógica de reemplazo total para persistir
-        return await self.actualizar_full(id_, candidato)
+    async def actualizar_partial(self, id_: UUID, cambios: dict) -> ProductoOut:
+        async with self._write_lock:
+            actual = self.obtener(id_)
+            if not actual:
+                raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+            # Mezclamos actual + cambios (y validamos con ProductoCreate para reutilizar reglas)
+            base = {
+                "nombre": actual.nombre,
+                "precio": actual.precio,
+                "categorias": actual.categorias,
+            }
+            # `cambios` ya viene de model_dump(exclude_unset=True) en el endpoint
+            base.update(cambios)
+
+            candidato = ProductoCreate(**base)
+
+            # Si nombre y categorías no cambian, solo hay que tocar el precio (y su índice)
+            if candidato.nombre == actual.nombre and candidato.categorias == actual.categorias:
+                nuevo = actual.model_copy(update={"precio": candidato.precio})
+                self._items[id_] = nuevo
+                self._cents[id_] = _a_centavos(nuevo.precio)
+                self._by_price.remove(actual)
+                self._by_price.add(nuevo)
+                self._version += 1
+                return nuevo
+
+            # Checar unicidad si cambió el nombre
+            if candidato.nombre.lower() != actual.nombre.lower():
+                if self.existe_nombre(self._norm_name(candidato.nombre)):
+                    raise HTTPException(
+                        status_code=409,
+                        detail={"code": "DUPLICATE_NAME", "message": "Ya existe un producto con ese nombre"},
+                    )
+
+            # Reutilizamos la lógica de reemplazo total para persistir
+            return await self._reemplazar(id_, candidato)
 
     async def borrar(self, id_: UUID) -> None:
-        actual = await self.obtener(id_)
-        if not actual:
-            raise HTTPException(status_code=404, detail="Producto no encontrado")
-        del self._items[id_]
-        norm = self._norm_name(actual.nombre)
-        if self._name_to_id.get(norm) == id_:
-            del self._name_to_id[norm]
+        async with self._write_lock:
+            actual = self.obtener(id_)
+            if not actual:
+                raise HTTPException(status_code=404, detail="Producto no encontrado")
+            del self._items[id_]
+            del self._norm_search[id_]
+            self._desindexar_categorias(id_, actual.categorias)
+            del self._masks[id_]
+            del self._cents[id_]
+            del self._seq[id_]
+            self._by_price.remove(actual)
+            norm = self._norm_name(actual.nombre)
+            if self._name_to_id.get(norm) == id_:
+                del self._name_to_id[norm]
+            self._version += 1
 
 
 # Instancia única en memoria para la demo
@@ -141,20 +371,120 @@ def get_repo() -> RepoProductos:
     return _repo
 
 
+# ------------- Caché de payloads ya validados (POST) -------------
+# Reintentos y dobles clics reenvían el mismo body: guardamos el ProductoCreate
+# validado por hash del JSON crudo y nos ahorramos volver a pasar por Pydantic.
+# Solo se usa en la creación; la validación no depende del estado del repositorio.
+_validados = _LRU(1024)
+
+def _es_json(content_type: Optional[str]) -> bool:
+    # Mismo criterio que FastAPI: application/json o application/*+json
+    if not content_type:
+        return False
+    message = email.message.Message()
+    message["content-type"] = content_type
+    if message.get_content_maintype() != "application":
+        return False
+    subtype = message.get_content_subtype()
+    return subtype == "json" or subtype.endswith("+json")
+
+
+async def producto_validado(request: Request) -> ProductoCreate:
+    # Replica el manejo del body de FastAPI (Content-Type, body vacío, JSON inválido)
+    # para que los errores 422 tengan la misma forma; solo el JSON válido pasa por la caché.
+    raw = await request.body()
+    if not raw:
+        raise RequestValidationError([{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}])
+
+    es_json = _es_json(request.headers.get("content-type"))
+    if es_json:
+        key = hashlib.blake2b(raw, digest_size=16).digest()
+        prod = _validados.get(key)
+        if prod is not None:
+            return prod
+        try:
+            body = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise RequestValidationError([{
+                "type": "json_invalid",
+                "loc": ("body", e.pos),
+                "msg": "JSON decode error",
+                "input": {},
+                "ctx": {"error": e.msg},
+            }])
+        except Exception as e:
+            # Bytes que no son UTF-8, anidamiento excesivo, etc.: el mismo 400 genérico de FastAPI
+            raise HTTPException(status_code=400, detail="There was an error parsing the body") from e
+    else:
+        # Sin JSON, FastAPI valida los bytes crudos contra el modelo (y responde 422)
+        body = raw
+
+    try:
+        # from_attributes como FastAPI, para obtener exactamente los mismos errores
+        prod = ProductoCreate.model_validate(body, from_attributes=True)
+    except ValidationError as e:
+        raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)])
+    if es_json:
+        _validados.put(key, prod)
+    return prod
+
+
+def _etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match puede traer una lista separada por comas; GET usa comparación
+    # débil (se ignora el prefijo W/) y "*" coincide con cualquier recurso existente.
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+# Respuesta GET cacheada en repo.respuestas. Al escribir cambia la versión del repo,
+# así que las entradas viejas simplemente dejan de usarse. El ETag también sale de esa
+# versión única: cualquier escritura invalida el ETag de todos los productos, aunque
+# el producto pedido no haya cambiado (el cliente recibe un 200 de más, nunca un 304 viejo).
+def _json_response(request: Request, body: bytes, etag: str) -> Response:
+    if _etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
 # ----------------------- Endpoints -----------------------
 
-@router.post("/productos", response_model=ProductoOut, status_code=status.HTTP_201_CREATED)
-async def crear_producto(payload: ProductoCreate, repo: RepoProductos = Depends(get_repo)):
-    if await repo.existe_nombre(payload.nombre.lower()):
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail={"code": "DUPLICATE_NAME", "message": "Ya existe un producto con ese nombre"},
-        )
+@router.post(
+    "/productos",
+    response_model=ProductoOut,
+    status_code=status.HTTP_201_CREATED,
+    # El body se lee a mano en `producto_validado`; lo documentamos igual en OpenAPI
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/json": {"schema": ProductoCreate.model_json_schema()}},
+            "required": True,
+        }
+    },
+)
+async def crear_producto(
+    payload: ProductoCreate = Depends(producto_validado),
+    repo: RepoProductos = Depends(get_repo),
+):
     return await repo.crear(payload)
 
 
+@router.post("/productos/bulk", response_model=list[ProductoOut], status_code=status.HTTP_201_CREATED)
+async def crear_productos_bulk(
+    payload: list[ProductoCreate] = Body(..., max_length=BULK_MAX),
+    repo: RepoProductos = Depends(get_repo),
+):
+    if not payload:
+        raise HTTPException(status_code=400, detail="Debes enviar al menos un producto")
+    return await repo.crear_varios(payload)
+
+
 @router.get("/productos", response_model=ProductosPage)
 async def listar_productos(
+    request: Request,
     q: Optional[str] = Query(default=None, min_length=1, max_length=80, description="Búsqueda por nombre"),
     categoria: Optional[str] = Query(default=None, description="Filtrar por categoría"),
     min_precio: Optional[Decimal] = Query(default=None, gt=0, description="Precio mínimo"),
@@ -167,19 +497,30 @@ async def listar_productos(
     if min_precio is not None and max_precio is not None and min_precio > max_precio:
         raise HTTPException(status_code=400, detail="min_precio no puede ser mayor que max_precio")
 
-    items, total = await repo.listar(q, categoria, min_precio, max_precio, limit, offset)
-    return ProductosPage(total=total, items=items)
+    key = (repo.version, "listar", q, categoria, min_precio, max_precio, limit, offset)
+    body = repo.respuestas.get(key)
+    if body is None:
+        items, total = await repo.listar(q, categoria, min_precio, max_precio, limit, offset)
+        body = ProductosPage(total=total, items=items).model_dump_json().encode()
+        repo.respuestas.put(key, body)
+    return _json_response(request, body, repo.etag)
 
 
 @router.get("/productos/{id}", response_model=ProductoOut)
 async def obtener_producto(
+    request: Request,
     id: UUID = Path(..., description="ID del producto"),
     repo: RepoProductos = Depends(get_repo),
 ):
-    prod = await repo.obtener(id)
-    if not prod:
-        raise HTTPException(status_code=404, detail="Producto no encontrado")
-    return prod
+    key = (repo.version, "obtener", id)
+    body = repo.respuestas.get(key)
+    if body is None:
+        prod = repo.obtener(id)
+        if not prod:
+            raise HTTPException(status_code=404, detail="Producto no encontrado")
+        body = prod.model_dump_json().encode()
+        repo.respuestas.put(key, body)
+    return _json_response(request, body, repo.etag)
 
 
 @router.put("/productos/{id}", response_model=ProductoOut)
@@ -198,9 +539,10 @@ async def actualizar_parcial_producto(
     repo: RepoProductos = Depends(get_repo),
 ):
     # Asegura que haya al menos un campo en el body
-    if not payload.model_dump(exclude_unset=True):
+    patch = payload.model_dump(exclude_unset=True)
+    if not patch:
         raise HTTPException(status_code=400, detail="Debes enviar al menos un campo para actualizar")
-    return await repo.actualizar_partial(id, payload)
+    return await repo.actualizar_partial(id, patch)
 
 
 @router.delete("/productos/{id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -1,30 +1,69 @@
 # models.py
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from uuid import UUID, uuid4
 from typing import List
 from typing import Optional
 from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
-import unicodedata, re
+from functools import lru_cache
+import unicodedata, re, string, sys
+
+PRECIO_MAX = Decimal("1000000")
 
 CATEGORIAS_PERMITIDAS = {
     "fruta","verdura","grano","legumbre","lacteo","carnico",
     "procesado","organico","bebida","especia"
 }
-_name_re = re.compile(r"^[A-Za-zÁÉÍÓÚáéíóúÑñ0-9][A-Za-zÁÉÍÓÚáéíóúÑñ0-9 \-_.]{2,79}$")
+# Un bit por categoría permitida: el filtro por categoría es un AND de enteros
+_CAT_BIT = {c: 1 << i for i, c in enumerate(sorted(CATEGORIAS_PERMITIDAS))}
+
+def _cat_mask(categorias: List[str]) -> int:
+    mask = 0
+    for c in categorias:
+        mask |= _CAT_BIT[c]
+    return mask
+
+def _a_centavos(precio: Decimal, rounding: str = ROUND_HALF_UP) -> int:
+    # Precio como entero de centavos; para cotas de rango usar ROUND_CEILING / ROUND_FLOOR.
+    # Se cuantiza antes de multiplicar para no perder dígitos con la precisión del contexto;
+    # el valor debe estar acotado (<= PRECIO_MAX), si no quantize lanza InvalidOperation.
+    return int(precio.quantize(Decimal("0.01"), rounding=rounding) * 100)
+
+_name_re = re.compile(r"[A-Za-zÁÉÍÓÚáéíóúÑñ0-9][A-Za-zÁÉÍÓÚáéíóúÑñ0-9 \-_.]{2,79}")
+_name_match = _name_re.fullmatch
+# Colapsa cualquier racha de espacios en uno solo (una pasada en C, sin lista intermedia)
+_WS_COLLAPSE = re.compile(r"\s+")
+
+# Camino rápido para nombres ASCII: mismas reglas que _name_re sin pasar por el motor de regex
+_NAME_FIRST_ASCII = frozenset(string.ascii_letters + string.digits)
+_NAME_CHARS_ASCII = _NAME_FIRST_ASCII | frozenset(" -_.")
+
+def _name_fast_ok(v: str) -> bool:
+    return 3 <= len(v) <= 80 and v[0] in _NAME_FIRST_ASCII and _NAME_CHARS_ASCII.issuperset(v)
 
-def _strip_accents(s: str) -> str:
-    return "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+# Tabla para str.translate: elimina todos los caracteres combinantes (acentos, diéresis...)
+_COMBINING = {cp: None for cp in range(0x110000) if unicodedata.combining(chr(cp))}
+
+def _strip_accents_impl(s: str) -> str:
+    return unicodedata.normalize("NFKD", s).translate(_COMBINING)
+
+# Nombres, categorías y búsquedas se repiten mucho: cacheamos el resultado por texto
+_strip_accents = lru_cache(maxsize=8192)(_strip_accents_impl)
 
 class ProductoCreate(BaseModel):
+    # Inmutable (lo hereda ProductoOut): los objetos se comparten entre cachés e índices
+    model_config = ConfigDict(frozen=True)
+
     nombre: str = Field(min_length=3, max_length=80)
-    precio: Decimal = Field(gt=0, le=Decimal("1000000"))
+    precio: Decimal = Field(gt=0, le=PRECIO_MAX)
     categorias: List[str] = Field(min_items=1, max_items=10)
 
     @field_validator("nombre")
     @classmethod
     def validar_nombre(cls, v: str) -> str:
-        v = " ".join(v.strip().split())
-        if not _name_re.match(v):
+        v = _WS_COLLAPSE.sub(" ", v).strip()
+        if v.isascii() and _name_fast_ok(v):
+            return v
+        if not _name_match(v):
             raise ValueError("Nombre inválido (3-80, letras/números/ - _ .)")
         return v
 
@@ -48,7 +87,8 @@ class ProductoCreate(BaseModel):
             if not c_norm or c_norm not in CATEGORIAS_PERMITIDAS:
                 raise ValueError(f"Categoría no permitida: {c}")
             if c_norm not in vistos:
-                limpias.append(c_norm)
+                # Solo hay 10 valores posibles: internarlos evita copias por producto
+                limpias.append(sys.intern(c_norm))
                 vistos.add(c_norm)
         return limpias
 
@@ -57,7 +97,7 @@ class ProductoOut(ProductoCreate):
 
 class ProductoUpdate(BaseModel):
     nombre: Optional[str] = Field(default=None, min_length=3, max_length=80)
-    precio: Optional[Decimal] = Field(default=None, gt=0, le=Decimal("1000000"))
+    precio: Optional[Decimal] = Field(default=None, gt=0, le=PRECIO_MAX)
     categorias: Optional[List[str]] = Field(default=None, min_items=1, max_items=10)
 
     @field_validator("nombre")
@@ -65,8 +105,10 @@ class ProductoUpdate(BaseModel):
     def validar_nombre(cls, v: Optional[str]) -> Optional[str]:
         if v is None:
             return v
-        v = " ".join(v.strip().split())
-        if not _name_re.match(v):
+        v = _WS_COLLAPSE.sub(" ", v).strip()
+        if v.isascii() and _name_fast_ok(v):
+            return v
+        if not _name_match(v):
             raise ValueError("Nombre inválido (3-80, letras/números/ - _ .)")
         return v
 
@@ -94,7 +136,8 @@ class ProductoUpdate(BaseModel):
             if not c_norm or c_norm not in CATEGORIAS_PERMITIDAS:
                 raise ValueError(f"Categoría no permitida: {c}")
             if c_norm not in vistos:
-                limpias.append(c_norm)
+                # Solo hay 10 valores posibles: internarlos evita copias por producto
+                limpias.append(sys.intern(c_norm))
                 vistos.add(c_norm)
         return limpias
 
@@ -0,0 +1,397 @@
+# test_main.py
+import os
+import random
+import sys
+import unicodedata
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import BULK_MAX, RepoProductos, get_repo  # noqa: E402
+from main import app  # noqa: E402
+from models import _name_fast_ok, _name_match  # noqa: E402
+
+
+def _producto(nombre, precio, categorias):
+    return {"nombre": nombre, "precio": precio, "categorias": categorias}
+
+
+@pytest.fixture
+def repo():
+    # Repositorio nuevo por test (el de la app es un singleton de módulo)
+    nuevo = RepoProductos()
+    app.dependency_overrides[get_repo] = lambda: nuevo
+    yield nuevo
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def client(repo):
+    return TestClient(app)
+
+
+def _crear(client, nombre, precio, categorias):
+    r = client.post("/api/productos", json=_producto(nombre, precio, categorias))
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def _nombres(r):
+    assert r.status_code == 200, r.text
+    return [p["nombre"] for p in r.json()["items"]]
+
+
+# ----------------------- Validación de nombres -----------------------
+
+def test_camino_rapido_ascii_equivale_a_la_regex():
+    casos = ["ab", "abc", "a" * 80, "a" * 81, "-abc", ".abc", " abc", "_abc", "abc ", "a-b.c_d e", "9ab"]
+    # Cada carácter ASCII imprimible (más tab y newline), al principio y en el medio
+    for c in map(chr, [9, 10, *range(32, 127)]):
+        casos += [c + "bcd", "ab" + c + "d", "abc" + c, "a" * 79 + c, "a" * 80 + c]
+    for v in casos:
+        assert _name_fast_ok(v) == bool(_name_match(v)), repr(v)
+
+
+# ----------------------- Filtros de precio -----------------------
+
+def test_cotas_de_precio_enormes_no_rompen_el_listado(client):
+    _crear(client, "Manzana", "3", ["fruta"])
+    _crear(client, "Leche", "20", ["lacteo"])
+
+    r = client.get("/api/productos", params={"max_precio": "9E+999999"})
+    assert _nombres(r) == ["Manzana", "Leche"]
+
+    r = client.get("/api/productos", params={"min_precio": "9E+999999"})
+    assert r.json() == {"total": 0, "items": []}
+
+    r = client.get("/api/productos", params={"min_precio": "1E-999999", "max_precio": "9E+999999"})
+    assert r.json()["total"] == 2
+
+
+def test_cotas_de_precio_con_muchos_decimales(client):
+    _crear(client, "Manzana", "1", ["fruta"])
+    _crear(client, "Pera", "1.01", ["fruta"])
+
+    r = client.get("/api/productos", params={"min_precio": "1.000000000000000000000000000001"})
+    assert _nombres(r) == ["Pera"]
+
+    r = client.get("/api/productos", params={"max_precio": "1.009999999999999999999999999999"})
+    assert _nombres(r) == ["Manzana"]
+
+
+# ----------------------- Caché de respuestas GET -----------------------
+
+def test_escritura_invalida_la_cache_y_etag_da_304(client):
+    prod = _crear(client, "Manzana", "3", ["fruta"])
+
+    r = client.get(f"/api/productos/{prod['id']}")
+    etag = r.headers["etag"]
+    assert client.get(f"/api/productos/{prod['id']}", headers={"If-None-Match": etag}).status_code == 304
+    lista = client.get("/api/productos")
+    assert lista.json()["items"][0]["precio"] == "3.00"
+
+    assert client.patch(f"/api/productos/{prod['id']}", json={"precio": "4"}).status_code == 200
+
+    r = client.get(f"/api/productos/{prod['id']}", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert r.json()["precio"] == "4.00"
+    assert client.get("/api/productos").json()["items"][0]["precio"] == "4.00"
+
+
+def test_if_none_match_acepta_listas_etags_debiles_y_comodin(client):
+    prod = _crear(client, "Manzana", "3", ["fruta"])
+    url = f"/api/productos/{prod['id']}"
+    etag = client.get(url).headers["etag"]
+
+    for valor in (f'"otro", {etag}', f"W/{etag}", f' "x" ,W/{etag} ', "*"):
+        r = client.get(url, headers={"If-None-Match": valor})
+        assert r.status_code == 304, valor
+        assert r.headers["etag"] == etag
+    assert client.get("/api/productos", headers={"If-None-Match": "*"}).status_code == 304
+
+    for valor in ('"otro"', f"W/{etag[:-1]}", ""):
+        assert client.get(url, headers={"If-None-Match": valor}).status_code == 200, valor
+
+
+def test_cache_no_se_comparte_entre_repositorios(client):
+    _crear(client, "Manzana", "3", ["fruta"])
+    r_a = client.get("/api/productos")
+    assert _nombres(r_a) == ["Manzana"]
+
+    otro = RepoProductos()
+    app.dependency_overrides[get_repo] = lambda: otro
+    _crear(client, "Leche", "20", ["lacteo"])
+    r_b = client.get("/api/productos")
+    assert _nombres(r_b) == ["Leche"]
+    assert r_b.headers["etag"] != r_a.headers["etag"]
+    assert client.get("/api/productos", headers={"If-None-Match": r_a.headers["etag"]}).status_code == 200
+
+
+# ----------------------- Orden de los resultados -----------------------
+
+def test_filtro_por_categoria_respeta_el_orden_del_catalogo(client):
+    aaa = _crear(client, "Aaa", "3", ["grano"])
+    _crear(client, "Bbb", "2", ["fruta"])
+    _crear(client, "Ccc", "1", ["fruta"])
+    r = client.patch(f"/api/productos/{aaa['id']}", json={"categorias": ["grano", "fruta"]})
+    assert r.status_code == 200, r.text
+
+    assert _nombres(client.get("/api/productos")) == ["Aaa", "Bbb", "Ccc"]
+    assert _nombres(client.get("/api/productos", params={"categoria": "fruta"})) == ["Aaa", "Bbb", "Ccc"]
+    assert _nombres(client.get("/api/productos", params={"categoria": "fruta", "offset": 1, "limit": 1})) == ["Bbb"]
+
+
+def test_mismo_orden_con_cualquier_combinacion_de_filtros(client):
+    # Precios y categorías "desordenados" respecto al orden de alta
+    for nombre, precio, cats in [
+        ("Cafe tostado", "9", ["grano"]),
+        ("Arroz", "1", ["grano"]),
+        ("Cafe molido", "5", ["grano", "organico"]),
+        ("Leche", "7", ["lacteo"]),
+        ("Cafe verde", "2", ["organico"]),
+    ]:
+        _crear(client, nombre, precio, cats)
+    catalogo = _nombres(client.get("/api/productos"))
+
+    for params in [
+        {"q": "cafe"},
+        {"q": "cafe", "min_precio": "2"},
+        {"min_precio": "2"},
+        {"max_precio": "8"},
+        {"categoria": "grano"},
+        {"categoria": "grano", "min_precio": "2"},
+        {"categoria": "organico", "max_precio": "9", "q": "cafe"},
+    ]:
+        nombres = _nombres(client.get("/api/productos", params=params))
+        assert nombres == [n for n in catalogo if n in nombres], params
+
+
+def test_rango_de_precio_angosto_respeta_el_orden_del_catalogo(client):
+    # Rango de menos de 1/8 del catálogo: sale del índice de precios y se reordena
+    r = client.post("/api/productos/bulk", json=[
+        _producto(f"Prod {i}", str(50 - i), ["grano", "fruta"] if i % 2 else ["grano"]) for i in range(50)
+    ])
+    assert r.status_code == 201, r.text
+    ids = [p["id"] for p in r.json()]
+    # Categoría con menos de 1/8 del catálogo, sumada fuera de orden: se filtra sobre sus IDs
+    for i in (30, 0, 20, 10):
+        assert client.patch(f"/api/productos/{ids[i]}", json={"categorias": ["grano", "lacteo"]}).status_code == 200
+    assert _nombres(client.get("/api/productos", params={"categoria": "lacteo", "min_precio": "20"})) == [
+        "Prod 0", "Prod 10", "Prod 20", "Prod 30"]
+
+    assert _nombres(client.get("/api/productos", params={"min_precio": "10", "max_precio": "13"})) == [
+        "Prod 37", "Prod 38", "Prod 39", "Prod 40"]
+    r = client.get("/api/productos", params={"categoria": "grano", "min_precio": "10", "max_precio": "12", "offset": 1})
+    assert _nombres(r) == ["Prod 39", "Prod 40"]
+    assert r.json()["total"] == 3
+
+
+# ----------------------- Body de POST /productos -----------------------
+
+_BODY = b'{"nombre": "Queso fresco", "precio": "2", "categorias": ["lacteo"]}'
+
+
+def test_post_exige_content_type_json(client):
+    for headers in ({"Content-Type": "text/plain"}, {}):
+        r = client.post("/api/productos", content=_BODY, headers=headers)
+        assert r.status_code == 422
+        assert r.json()["detail"][0]["type"] == "model_attributes_type"
+        assert r.json()["detail"][0]["loc"] == ["body"]
+    assert client.get("/api/productos").json()["total"] == 0
+
+
+def test_post_errores_de_body_con_formato_de_fastapi(client):
+    r = client.post("/api/productos", content=b'{"nombre":', headers={"Content-Type": "application/json"})
+    assert r.status_code == 422
+    assert r.json()["detail"] == [
+        {"type": "json_invalid", "loc": ["body", 10], "msg": "JSON decode error", "input": {},
+         "ctx": {"error": "Expecting value"}}
+    ]
+
+    r = client.post("/api/productos", content=b"", headers={"Content-Type": "application/json"})
+    assert r.json()["detail"] == [{"type": "missing", "loc": ["body"], "msg": "Field required", "input": None}]
+
+    for raw in (b'{"nombre":"Uv\xffa"}', b"[" * 100000):
+        r = client.post("/api/productos", content=raw, headers={"Content-Type": "application/json"})
+        assert r.status_code == 400
+        assert r.json() == {"detail": "There was an error parsing the body"}
+
+    r = client.post("/api/productos", json={"nombre": "ab", "precio": "1", "categorias": ["fruta"]})
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["loc"] == ["body", "nombre"]
+
+
+def test_post_repetido_usa_payload_cacheado(client):
+    headers = {"Content-Type": "application/json"}
+    prod = client.post("/api/productos", content=_BODY, headers=headers).json()
+    assert client.post("/api/productos", content=_BODY, headers=headers).status_code == 409
+    assert client.delete(f"/api/productos/{prod['id']}").status_code == 204
+
+    r = client.post("/api/productos", content=_BODY, headers={"Content-Type": "application/vnd.api+json"})
+    assert r.status_code == 201
+    assert r.json()["precio"] == "2.00" and r.json()["id"] != prod["id"]
+
+
+# ----------------------- POST /productos/bulk -----------------------
+
+def test_bulk_crea_todos_en_orden(client):
+    lote = [_producto("Arroz", "1.5", ["grano"]), _producto("Frijol", "2", ["legumbre", "grano"])]
+    r = client.post("/api/productos/bulk", json=lote)
+    assert r.status_code == 201, r.text
+    assert [p["nombre"] for p in r.json()] == ["Arroz", "Frijol"]
+    assert _nombres(client.get("/api/productos", params={"categoria": "grano", "max_precio": "2"})) == ["Arroz", "Frijol"]
+
+
+def test_bulk_nombre_repetido_en_el_lote(client):
+    lote = [_producto("Sal fina", "1", ["especia"]), _producto("sal  FINA", "2", ["especia"])]
+    r = client.post("/api/productos/bulk", json=lote)
+    assert r.status_code == 409
+    assert r.json()["detail"]["code"] == "DUPLICATE_NAME"
+    assert client.get("/api/productos").json()["total"] == 0
+
+
+def test_bulk_nombre_que_ya_existe(client):
+    _crear(client, "Sal fina", "1", ["especia"])
+    lote = [_producto("Pimienta", "3", ["especia"]), _producto("SAL FINA", "2", ["especia"])]
+    r = client.post("/api/productos/bulk", json=lote)
+    assert r.status_code == 409
+    assert r.json()["detail"]["code"] == "DUPLICATE_NAME"
+    assert _nombres(client.get("/api/productos")) == ["Sal fina"]
+
+
+def test_bulk_limita_el_tamano_del_lote(client):
+    lote = [_producto(f"Producto {i}", "1", ["fruta"]) for i in range(BULK_MAX + 1)]
+    r = client.post("/api/productos/bulk", json=lote)
+    assert r.status_code == 422
+    assert client.get("/api/productos").json()["total"] == 0
+
+    assert client.post("/api/productos/bulk", json=lote[:BULK_MAX]).status_code == 201
+    assert client.post("/api/productos/bulk", json=[]).status_code == 400
+
+
+def test_patch_solo_precio_actualiza_los_filtros(client):
+    # Camino rápido de PATCH: solo cambia el precio, pero los filtros deben verlo
+    prod = _crear(client, "Manzana", "30", ["fruta"])
+    _crear(client, "Pera", "35", ["fruta"])
+    # Varios lácteos en el rango para que también se recorra el camino por categoría
+    for i, nombre in enumerate(["Leche", "Queso", "Yogur"]):
+        _crear(client, nombre, str(31 + i), ["lacteo"])
+    assert client.patch(f"/api/productos/{prod['id']}", json={"precio": "5"}).status_code == 200
+
+    for params in ({"min_precio": "20"}, {"categoria": "fruta", "min_precio": "20"}):
+        assert "Manzana" not in _nombres(client.get("/api/productos", params=params))
+    for params in ({"max_precio": "10"}, {"categoria": "fruta", "max_precio": "10"}):
+        assert _nombres(client.get("/api/productos", params=params)) == ["Manzana"]
+
+
+# ----------------------- Consistencia de los índices -----------------------
+
+_PALABRAS = ["Café", "Piña", "Té", "Arroz", "Niño", "Queso", "Pan"]
+_CATS = ["fruta", "grano", "lacteo", "organico", "bebida"]
+_CONSULTAS = [
+    {},
+    {"q": "cafe"},
+    {"q": "pi"},
+    {"categoria": "grano"},
+    {"categoria": "Orgánico"},
+    {"min_precio": "10"},
+    {"max_precio": "25.5"},
+    {"min_precio": "5.005", "max_precio": "30"},
+    {"min_precio": "12", "max_precio": "13"},
+    {"categoria": "grano", "min_precio": "12", "max_precio": "15"},
+    {"categoria": "fruta", "min_precio": "20"},
+    {"categoria": "bebida", "max_precio": "45"},
+    {"q": "n", "categoria": "lacteo", "min_precio": "1", "max_precio": "40"},
+]
+
+
+def _sin_acentos(s):
+    return "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+
+
+def _esperado(catalogo, params):
+    # Recorrido lineal sin índices sobre el modelo que lleva el test
+    res = list(catalogo.values())
+    if "q" in params:
+        res = [p for p in res if _sin_acentos(params["q"].lower()) in _sin_acentos(p["nombre"].lower())]
+    if "categoria" in params:
+        res = [p for p in res if _sin_acentos(params["categoria"].lower()) in p["categorias"]]
+    if "min_precio" in params:
+        res = [p for p in res if Decimal(p["precio"]) >= Decimal(params["min_precio"])]
+    if "max_precio" in params:
+        res = [p for p in res if Decimal(p["precio"]) <= Decimal(params["max_precio"])]
+    return res
+
+
+def _verificar(client, catalogo):
+    for params in _CONSULTAS:
+        esperado = _esperado(catalogo, params)
+        for offset, limit in ((0, 100), (1, 2), (3, 4)):
+            r = client.get("/api/productos", params={**params, "offset": offset, "limit": limit})
+            assert r.status_code == 200, r.text
+            assert r.json()["total"] == len(esperado), params
+            assert r.json()["items"] == esperado[offset: offset + limit], (params, offset, limit)
+
+
+def test_indices_consistentes_tras_cada_tipo_de_escritura(client, repo):
+    rnd = random.Random(1411)
+    catalogo = {}  # id -> producto, en orden de alta (PUT/PATCH no cambian la posición)
+    n = 0
+
+    def nuevo():
+        nonlocal n
+        n += 1
+        precio = str(Decimal(rnd.randint(100, 5000)) / 100)
+        return _producto(f"{rnd.choice(_PALABRAS)} {n}", precio, rnd.sample(_CATS, rnd.randint(1, 3)))
+
+    for paso in range(120):
+        ids = list(catalogo)
+        op = rnd.choice(["crear", "bulk", "put", "patch_precio", "patch", "borrar"] if ids else ["crear"])
+        if op == "crear":
+            prod = _crear(client, **nuevo())
+            catalogo[prod["id"]] = prod
+        elif op == "bulk":
+            r = client.post("/api/productos/bulk", json=[nuevo() for _ in range(rnd.randint(1, 4))])
+            assert r.status_code == 201, r.text
+            catalogo.update((p["id"], p) for p in r.json())
+        elif op == "put":
+            id_ = rnd.choice(ids)
+            r = client.put(f"/api/productos/{id_}", json=nuevo())
+            assert r.status_code == 200, r.text
+            catalogo[id_] = r.json()
+        elif op == "patch_precio":
+            id_ = rnd.choice(ids)
+            r = client.patch(f"/api/productos/{id_}", json={"precio": str(rnd.randint(1, 50))})
+            assert r.status_code == 200, r.text
+            catalogo[id_] = r.json()
+        elif op == "patch":
+            id_ = rnd.choice(ids)
+            cambios = {k: v for k, v in nuevo().items() if k != "precio" and rnd.random() < 0.7}
+            cambios = cambios or {"categorias": ["bebida"]}
+            r = client.patch(f"/api/productos/{id_}", json=cambios)
+            assert r.status_code == 200, r.text
+            catalogo[id_] = r.json()
+        else:
+            id_ = rnd.choice(ids)
+            assert client.delete(f"/api/productos/{id_}").status_code == 204
+            del catalogo[id_]
+            assert client.get(f"/api/productos/{id_}").status_code == 404
+
+        _verificar(client, catalogo)
+
+    for id_, prod in catalogo.items():
+        assert client.get(f"/api/productos/{id_}").json() == prod
+    # Ningún índice por ID conserva entradas de productos borrados
+    for indice in (repo._norm_search, repo._masks, repo._cents, repo._seq):
+        assert indice.keys() == repo._items.keys()
+    # listar recorre _items, _masks y _cents en paralelo
+    assert list(repo._cents) == list(repo._masks) == list(repo._items)
+    # y cada categoría en orden de catálogo
+    for ids in repo._by_cat.values():
+        assert list(ids) == [i for i in repo._items if i in ids]
+    assert sorted(p.id for p in repo._by_price) == sorted(repo._items)
+    assert {i for ids in repo._by_cat.values() for i in ids} == set(repo._items)